@@ -91,6 +91,7 @@ class Surepy:
         auth_token: str | None = None,
         api_timeout: int = API_TIMEOUT,
         session: aiohttp.ClientSession | None = None,
+        connector: aiohttp.BaseConnector | None = None,
     ) -> None:
         """Initialize the connection to the Sure Petcare API."""
 
@@ -106,6 +107,7 @@ class Surepy:
             api_timeout=api_timeout,
             session=self._session,
             surepy_version=__version__,
+            connector=connector,
         )
 
         # api token management
@@ -100,10 +100,18 @@ class SureAPIClient:
         api_timeout: int = API_TIMEOUT,
         session: aiohttp.ClientSession | None = None,
         surepy_version: str | None = None,
+        connector: aiohttp.BaseConnector | None = None,
     ) -> None:
         """Initialize the connection to the Sure Petcare API."""
 
+        if session and connector:
+            raise ValueError("pass either a session or a connector, not both")
+
         self._session = session
+        # used to create a session on first use if none was passed in
+        self._connector = connector
+        # only sessions created by the client are closed by it, passed in ones belong to the caller
+        self._owns_session: bool = False
 
         # sure petcare credentials
         self.email = email
@@ -153,6 +161,33 @@ class SureAPIClient:
             "X-Device-Id": self._device_id,
         }
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it from ``connector`` if needed."""
+        if not self._session and self._connector:
+            self._session = aiohttp.ClientSession(connector=self._connector)
+            self._owns_session = True
+
+        return self._session if self._session else aiohttp.ClientSession()
+
+    async def close_session(self) -> None:
+        """Close the http session (or the unused connector), if it was created by the client.
+
+        The connector is closed along with the session, later calls fall back to a
+        new session per request.
+        """
+        if self._owns_session and self._session:
+            if not self._session.closed:
+                await self._session.close()
+
+            self._session = None
+            self._owns_session = False
+
+        elif self._connector and not self._connector.closed:
+            # no request was made, so no session took ownership of the connector
+            await self._connector.close()
+
+        self._connector = None
+
     async def get_token(self) -> str | None:
         """Get or refresh the authentication token."""
         authentication_data: dict[str, str | None] = dict(
@@ -161,7 +196,7 @@ class SureAPIClient:
 
         token: str | None = None
 
-        session = self._session if self._session else aiohttp.ClientSession()
+        session = self._get_session()
 
         try:
             raw_response: aiohttp.ClientResponse = await session.post(
@@ -222,7 +257,7 @@ class SureAPIClient:
 
         response_data = None
 
-        session = self._session if self._session else aiohttp.ClientSession()
+        session = self._get_session()
 
         try:
             with async_timeout.timeout(self._api_timeout):
@@ -9,20 +9,22 @@ The cli module of surepy
 from __future__ import annotations
 
 import asyncio
+import heapq
 import json
+import sys
 
 from datetime import datetime
 from functools import wraps
+from itertools import chain
 from pathlib import Path
 from shutil import copyfile
-from sys import exit
-from typing import Any, cast
+from time import time
+from typing import Any, Iterable, cast
 
 import click
 
-from aiohttp import ClientSession, TCPConnector
-from rich import box
-from rich.table import Table
+from aiohttp import TCPConnector
+from rich.cells import cell_len
 
 from surepy import Surepy, __name__ as sp_name, __version__ as sp_version, console, natural_time
 from surepy.entities.devices import Flap, SurepyDevice
@@ -36,11 +38,39 @@ TOKEN_ENV = "SUREPY_TOKEN"
 def coro(f: Any) -> Any:
     @wraps(f)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
-        return asyncio.run(f(*args, **kwargs))
+        async def run() -> Any:
+            try:
+                return await f(*args, **kwargs)
+            finally:
+                # close the shared session exactly once, inside the running loop
+                if sp := (click.get_current_context().find_object(dict) or {}).get("sp"):
+                    await sp.sac.close_session()
+
+        return asyncio.run(run())
 
     return wrapper
 
 
+async def _get_sp(
+    ctx: click.Context,
+    token: str | None = None,
+    email: str | None = None,
+    password: str | None = None,
+) -> Surepy:
+    """get the shared :class:`Surepy` instance, creating it (and its session) on first use"""
+
+    if "sp" not in ctx.obj:
+        # all requests go to a single host - keep a few sockets alive and cache the dns lookup
+        connector = TCPConnector(
+            limit=10, limit_per_host=4, ttl_dns_cache=300, keepalive_timeout=30
+        )
+        ctx.obj["sp"] = Surepy(
+            email=email, password=password, auth_token=token, connector=connector
+        )
+
+    return cast(Surepy, ctx.obj["sp"])
+
+
 token_file = Path("~/.surepy.token").expanduser()
 old_token_file = token_file.with_suffix(".old_token")
 
@@ -51,6 +81,41 @@ version_message = (
 )
 
 
+# columns of the streamed report output
+REPORT_COLUMNS: tuple[str, ...] = ("pet", "from", "to", "duration", "entry_device", "exit_device")
+# number of datapoints shown per pet
+REPORT_DATAPOINTS = 25
+
+
+def _report_widths(pet_names: Iterable[str], device_names: Iterable[str]) -> list[int]:
+    """column widths of the report, with the name columns fitting all given names"""
+    pet_width = max(map(cell_len, pet_names), default=0)
+    device_width = max(map(cell_len, device_names), default=0)
+
+    # in order of REPORT_COLUMNS, no column is narrower than its header
+    widths = (pet_width, 11, 11, 12, device_width, device_width)
+    return [max(width, len(column)) for column, width in zip(REPORT_COLUMNS, widths)]
+
+
+def _report_line(cells: Iterable[Any], widths: Iterable[int]) -> str:
+    """pad ``cells`` to ``widths``, measured in terminal cells to handle wide characters"""
+    return " ".join(
+        f"{cell}{' ' * (width - cell_len(cell))}" for cell, width in zip(map(str, cells), widths)
+    ).rstrip()
+
+
+def _token_file_differs(token: str) -> bool:
+    """check if the token file exists and contains something other than ``token``"""
+    try:
+        # a differing size already tells us the content differs, no need to read the file
+        if token_file.stat().st_size != len(token.encode("utf-8")):
+            return True
+    except FileNotFoundError:
+        return False
+
+    return token != token_file.read_text(encoding="utf-8")
+
+
 def print_header() -> None:
     """print header to terminal"""
     print()
@@ -70,17 +135,33 @@ def token_available(ctx: click.Context) -> str | None:
     return None
 
 
-# async def json_response(
-#     data: dict[str, Any], ctx: click.Context, sp: Surepy | None = None
-# ) -> None:
-#     if ctx.obj.get("json", False):
-#         if sp:
-#             await sp.sac.close_session()
-#
-#         console.print(data)
-#
-#         exit(0)
-#
+def _json_mode(ctx: click.Context) -> bool:
+    """check if json output was requested"""
+    return bool(ctx.obj.get("json", False))
+
+
+def json_response(data: Any, ctx: click.Context) -> bool:
+    """print ``data`` as json if json output was requested
+
+    Returns:
+        bool: True if ``data`` was printed and no further (pretty) output should follow
+    """
+    if not _json_mode(ctx):
+        return False
+
+    # orjson is optional but serializes large reports a lot faster
+    try:
+        import orjson
+
+        raw = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    except ImportError:
+        raw = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+    sys.stdout.flush()
+    sys.stdout.buffer.write(raw + b"\n")
+    sys.stdout.flush()
+
+    return True
 
 
 @click.group(context_settings=CONTEXT_SETTINGS, invoke_without_command=True)
@@ -111,7 +192,7 @@ def cli(ctx: click.Context, json: bool, user_token: str, version: bool) -> None:
 
         if version:
             click.echo(version_message)
-            exit(0)
+            sys.exit(0)
 
         click.echo(ctx.get_help())
 
@@ -135,20 +216,20 @@ async def token(ctx: click.Context, user: str, password: str) -> None:
 
     surepy_token: str | None = None
 
-    async with ClientSession(connector=TCPConnector(ssl=False)) as session:
-        sp = Surepy(email=user, password=password, session=session)
+    sp = await _get_sp(ctx, email=user, password=password)
 
-        if surepy_token := await sp.sac.get_token():
+    if surepy_token := await sp.sac.get_token():
 
-            if token_file.exists() and surepy_token != token_file.read_text(encoding="utf-8"):
-                copyfile(token_file, old_token_file)
+        if _token_file_differs(surepy_token):
+            copyfile(token_file, old_token_file)
 
-            token_file.write_text(surepy_token, encoding="utf-8")
+        token_file.write_text(surepy_token, encoding="utf-8")
 
-        # await sp.sac.close_session()
+    if json_response({"token": surepy_token}, ctx):
+        return
 
     console.rule(f"[bold]{user}[/] [#ff1d5e]·[/] [bold]Token[/]", style="#ff1d5e")
-    console.print(f"[bold]{token}[/]", soft_wrap=True)
+    console.print(f"[bold]{surepy_token}[/]", soft_wrap=True)
     console.rule(style="#ff1d5e")
     print()
 
@@ -164,56 +245,55 @@ async def pets(ctx: click.Context, token: str | None) -> None:
 
     token = token if token else ctx.obj.get("token", None)
 
-    async with ClientSession(connector=TCPConnector(ssl=False)) as session:
-        sp = Surepy(auth_token=token, session=session)
-
-        pets: list[Pet] = await sp.get_pets()
-
-        # json output
-        if ctx.obj.get("json", False):
-            for pet in pets:
-                json_str = json.dumps(pet.raw_data(), indent=4)
-                print(json_str)
-            return
-
-        # pretty print
-        table = Table(box=box.MINIMAL)
-        table.add_column("Name", style="bold")
-        table.add_column("Where", justify="right")
-        table.add_column("Feeding A", justify="right", style="bold")
-        table.add_column("Feeding B", justify="right", style="bold")
-        table.add_column("Lunch Time", justify="right", style="bold")
-        table.add_column("Drinking", justify="right", style="bold")
-        table.add_column("Drink Time", justify="right", style="bold")
-        table.add_column("ID 👤 ", justify="right")
-        table.add_column("Household 🏡", justify="right")
-
-        for pet in pets:
-
-            feeding_a = feeding_b = lunch_time = None
-            drinking_change = drink_time = None
-
-            if pet.feeding:
-                feeding_a = f"{pet.feeding.change[0]}g"
-                feeding_b = f"{pet.feeding.change[1]}g"
-                lunch_time = pet.feeding.at.time() if pet.feeding.at else None
-            if pet.drinking:
-                drinking_change = f"{pet.drinking.change[0]}ml"
-                drink_time = pet.drinking.at.time() if pet.drinking.at else None
-
-            table.add_row(
-                str(pet.name),
-                str(pet.location),
-                f"{feeding_a}",
-                f"{feeding_b}",
-                str(lunch_time),
-                f"{drinking_change}",
-                str(drink_time),
-                str(pet.pet_id),
-                str(pet.household_id),
-            )
-
-        console.print(table, "", sep="\n")
+    sp = await _get_sp(ctx, token)
+
+    pets: list[Pet] = await sp.get_pets()
+
+    if json_response([pet.raw_data() for pet in pets], ctx):
+        return
+
+    # pretty print
+    from rich import box
+    from rich.table import Table
+
+    table = Table(box=box.MINIMAL)
+    table.add_column("Name", style="bold")
+    table.add_column("Where", justify="right")
+    table.add_column("Feeding A", justify="right", style="bold")
+    table.add_column("Feeding B", justify="right", style="bold")
+    table.add_column("Lunch Time", justify="right", style="bold")
+    table.add_column("Drinking", justify="right", style="bold")
+    table.add_column("Drink Time", justify="right", style="bold")
+    table.add_column("ID 👤 ", justify="right")
+    table.add_column("Household 🏡", justify="right")
+
+    for pet in pets:
+
+        feeding_a = feeding_b = lunch_time = "-"
+        drinking_change = drink_time = "-"
+
+        # both properties parse the raw data on every access
+        if feeding := pet.feeding:
+            feeding_a = f"{feeding.change[0]}g"
+            feeding_b = f"{feeding.change[1]}g"
+            lunch_time = str(feeding.at.time()) if feeding.at else "-"
+        if drinking := pet.drinking:
+            drinking_change = f"{drinking.change[0]}ml"
+            drink_time = str(drinking.at.time()) if drinking.at else "-"
+
+        table.add_row(
+            str(pet.name),
+            str(pet.location),
+            feeding_a,
+            feeding_b,
+            lunch_time,
+            drinking_change,
+            drink_time,
+            str(pet.pet_id),
+            str(pet.household_id),
+        )
+
+    console.print(table, "", sep="\n")
 
 
 @cli.command()
@@ -227,37 +307,40 @@ async def devices(ctx: click.Context, token: str | None) -> None:
 
     token = token if token else ctx.obj.get("token", None)
 
-    async with ClientSession(connector=TCPConnector(ssl=False)) as session:
-        sp = Surepy(auth_token=token, session=session)
+    sp = await _get_sp(ctx, token)
 
-        devices: list[SurepyDevice] = await sp.get_devices()
+    devices: list[SurepyDevice] = await sp.get_devices()
 
-        # await json_response(devices, ctx)
+    if json_response([device.raw_data() for device in devices], ctx):
+        return
 
-        # table = Table(title="[bold][#ff1d5e]·[/] Devices [#ff1d5e]·[/]", box=box.MINIMAL)
-        table = Table(box=box.MINIMAL)
-        table.add_column("ID", justify="right", style="")
-        table.add_column("Household", justify="right", style="")
-        table.add_column("Name", style="bold")
-        table.add_column("Type", style="")
-        table.add_column("Serial", style="")
+    from rich import box
+    from rich.table import Table
 
-        # sorted_devices = sorted(devices, key=lambda x: int(devices[x]["household_id"]))
+    # table = Table(title="[bold][#ff1d5e]·[/] Devices [#ff1d5e]·[/]", box=box.MINIMAL)
+    table = Table(box=box.MINIMAL)
+    table.add_column("ID", justify="right", style="")
+    table.add_column("Household", justify="right", style="")
+    table.add_column("Name", style="bold")
+    table.add_column("Type", style="")
+    table.add_column("Serial", style="")
 
-        # devices = await sp.sac.get_devices()
-        # devices = await sp.get_entities()
+    # sorted_devices = sorted(devices, key=lambda x: int(devices[x]["household_id"]))
 
-        for device in devices:
+    # devices = await sp.sac.get_devices()
+    # devices = await sp.get_entities()
 
-            table.add_row(
-                str(device.id),
-                str(device.household_id),
-                str(device.name),
-                str(device.type.name.replace("_", " ").title()),
-                str(device.serial) or "-",
-            )
+    for device in devices:
 
-        console.print(table, "", sep="\n")
+        table.add_row(
+            str(device.id),
+            str(device.household_id),
+            str(device.name),
+            str(device.type.name.replace("_", " ").title()),
+            str(device.serial or "-"),
+        )
+
+    console.print(table, "", sep="\n")
 
 
 @cli.command()
@@ -277,65 +360,82 @@ async def report(
 
     token = token if token else ctx.obj.get("token", None)
 
-    async with ClientSession(connector=TCPConnector(ssl=False)) as session:
-        sp = Surepy(auth_token=token, session=session)
-
-        entities = await sp.get_entities()
+    sp = await _get_sp(ctx, token)
 
-        json_data = await sp.get_report(pet_id=pet_id, household_id=household_id)
+    if _json_mode(ctx):
+        json_response(await sp.get_report(pet_id=pet_id, household_id=household_id), ctx)
+        return
 
-        if data := json_data.get("data"):
+    # entities are only needed to resolve pet and device names for the pretty output,
+    # they do not depend on the report so both are fetched concurrently
+    json_data, entities = await asyncio.gather(
+        sp.get_report(pet_id=pet_id, household_id=household_id), sp.get_entities()
+    )
 
-            table = Table(box=box.MINIMAL)
+    if data := json_data.get("data"):
 
-            all_keys: list[str] = ["pet", "from", "to", "duration", "entry_device", "exit_device"]
+        # the same few devices show up in most datapoints, resolve their names only once
+        names: dict[int, str] = {entity_id: entity.name for entity_id, entity in entities.items()}
 
-            for key in all_keys:
-                table.add_column(str(key))
+        # reference for the duration of still active datapoints, as epoch seconds
+        now = time()
 
-            for pet in data:
+        # rows are printed as soon as they are formatted instead of buffering a whole table
+        print()
+        widths = _report_widths(
+            (names.get(pet["pet_id"], "-") for pet in data),
+            (entity.name for entity in entities.values() if not isinstance(entity, Pet)),
+        )
 
-                datapoints_drinking: list[dict[str, Any]] = pet.get("drinking", {}).get(
-                    "datapoints", []
-                )
-                datapoints_feeding: list[dict[str, Any]] = pet.get("feeding", {}).get(
-                    "datapoints", []
-                )
-                datapoints_movement: list[dict[str, Any]] = pet.get("movement", {}).get(
-                    "datapoints", []
-                )
+        # lines may be wider than the terminal, wrapping them would break the columns
+        console.print(_report_line(REPORT_COLUMNS, widths), style="bold", soft_wrap=True)
+        console.print(
+            _report_line(("─" * width for width in widths), widths),
+            style="#666666",
+            soft_wrap=True,
+        )
 
-                datapoints = datapoints_drinking + datapoints_feeding + datapoints_movement
+        for pet in data:
 
-                if datapoints:
+            pet_name = names.get(pet["pet_id"], "-")
 
-                    for datapoint in datapoints:
+            datapoints: Iterable[dict[str, Any]] = chain(
+                pet.get("drinking", {}).get("datapoints", []),
+                pet.get("feeding", {}).get("datapoints", []),
+                pet.get("movement", {}).get("datapoints", []),
+            )
 
-                        from_time = datetime.fromisoformat(datapoint["from"])
-                        to_time = (
-                            datetime.fromisoformat(datapoint["to"])
-                            if "active" not in datapoint
-                            else None
-                        )
+            # only the most recent datapoints of each pet are shown. the api returns
+            # iso 8601 timestamps with a uniform offset, so they sort correctly as strings
+            # and only the selected rows need to be parsed
+            for datapoint in heapq.nlargest(REPORT_DATAPOINTS, datapoints, key=lambda x: x["from"]):
 
-                        if "active" in datapoint:
-                            datapoint["duration"] = (
-                                datetime.now(tz=from_time.tzinfo) - from_time
-                            ).total_seconds()
+                from_time = datetime.fromisoformat(datapoint["from"])
+                to_time = (
+                    datetime.fromisoformat(datapoint["to"]) if "active" not in datapoint else None
+                )
 
-                        entry_device = entities.get(datapoint.get("entry_device_id", 0), None)
-                        exit_device = entities.pop(datapoint.get("exit_device_id", 0), None)
+                if "active" in datapoint:
+                    datapoint["duration"] = now - from_time.timestamp()
 
-                        table.add_row(
-                            str(entities[pet["pet_id"]].name),
-                            str(from_time.strftime("%d/%m %H:%M")),
-                            str(to_time.strftime("%d/%m %H:%M") if to_time else "-"),
-                            str(natural_time(datapoint["duration"])),
-                            str(entry_device.name if entry_device else "-"),
-                            str(exit_device.name if exit_device else "-"),
-                        )
+                console.print(
+                    _report_line(
+                        (
+                            pet_name,
+                            from_time.strftime("%d/%m %H:%M"),
+                            to_time.strftime("%d/%m %H:%M") if to_time else "-",
+                            natural_time(datapoint["duration"]),
+                            names.get(datapoint.get("entry_device_id", 0), "-"),
+                            names.get(datapoint.get("exit_device_id", 0), "-"),
+                        ),
+                        widths,
+                    ),
+                    markup=False,
+                    highlight=False,
+                    soft_wrap=True,
+                )
 
-            console.print(table, "", sep="\n")
+        print()
 
 
 @cli.command()
@@ -349,25 +449,32 @@ async def notification(ctx: click.Context, token: str | None = None) -> None:
 
     token = token if token else ctx.obj.get("token", None)
 
-    async with ClientSession(connector=TCPConnector(ssl=False)) as session:
-        sp = Surepy(auth_token=token, session=session)
+    sp = await _get_sp(ctx, token)
 
-        json_data = await sp.get_notification() or None
+    json_data = await sp.get_notification() or None
 
-        if json_data and (data := json_data.get("data")):
+    if json_response(json_data, ctx):
+        return
 
-            table = Table(box=box.MINIMAL)
+    if json_data and (data := json_data.get("data")):
 
-            all_keys: set[str] = set()
-            all_keys.update(*[entry.keys() for entry in data])
+        from rich import box
+        from rich.table import Table
 
-            for key in all_keys:
-                table.add_column(str(key))
+        table = Table(box=box.MINIMAL)
 
-            for entry in data:
-                table.add_row(*([str(e) for e in entry.values()]))
+        # union of all keys, in order of first appearance to keep the columns stable
+        all_keys: dict[str, None] = {}
+        for entry in data:
+            all_keys.update(dict.fromkeys(entry))
 
-            console.print(table, "", sep="\n")
+        for key in all_keys:
+            table.add_column(str(key))
+
+        for entry in data:
+            table.add_row(*[str(entry.get(key, "-")) for key in all_keys])
+
+        console.print(table, "", sep="\n")
 
 
 @cli.command()
@@ -391,7 +498,7 @@ async def locking(ctx: click.Context, device_id: int, mode: str, token: str | No
 
     token = token if token else ctx.obj.get("token", None)
 
-    sp = Surepy(auth_token=str(token))
+    sp = await _get_sp(ctx, token)
 
     if (flap := await sp.get_device(device_id=device_id)) and (type(flap) == Flap):
 
@@ -415,17 +522,19 @@ async def locking(ctx: click.Context, device_id: int, mode: str, token: str | No
             return
 
         if lock_state:
-            console.print(f"setting {flap.name} to '{state}'...")
+            if not _json_mode(ctx):
+                console.print(f"setting {flap.name} to '{state}'...")
 
-            if await sp.sac._set_lock_state(device_id=device_id, mode=lock_state) and (
-                device := await sp.get_device(device_id=device_id)
-            ):
+            response = await sp.sac._set_lock_state(device_id=device_id, mode=lock_state)
+
+            if json_response(response, ctx):
+                return
+
+            if response and (device := await sp.get_device(device_id=device_id)):
                 console.print(f"✅ {device.name} set to '{state}' 🐾")
             else:
                 console.print(f"❌ setting to '{state}' may have worked but something is fishy..!")
 
-        # await sp.sac.close_session()
-
 
 @cli.command()
 @click.pass_context
@@ -447,7 +556,7 @@ async def position(
 
     token = token if token else ctx.obj.get("token", None)
 
-    sp = Surepy(auth_token=str(token))
+    sp = await _get_sp(ctx, token)
 
     pet: Pet | None
     location: Location | None
@@ -462,15 +571,18 @@ async def position(
             return
 
         if location:
-            if await sp.sac.set_position(pet.id, location):
+            response = await sp.sac.set_position(pet.id, location)
+
+            if json_response(response, ctx):
+                return
+
+            if response:
                 console.print(f"{pet.name} set to '{location.name}' 🐾")
             else:
                 console.print(
                     f"setting to '{location.name}' probably worked but something else is fishy...!"
                 )
 
-        # await sp.sac.close_session()
-
 
 if __name__ == "__main__":
     cli(obj={})